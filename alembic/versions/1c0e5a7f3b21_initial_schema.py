@@ -0,0 +1,57 @@
+"""initial schema
+
+Revision ID: 1c0e5a7f3b21
+Revises:
+Create Date: 2024-11-01 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c0e5a7f3b21'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Таблицы могли быть созданы до появления миграций в репозитории, поэтому существующие не трогаем
+    tables = sa.inspect(op.get_bind()).get_table_names()
+
+    if 'user' not in tables:
+        op.create_table(
+            'user',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('tg_id', sa.BigInteger(), nullable=False),
+            sa.Column('tg_name', sa.String(length=128), nullable=False),
+            sa.Column('is_blocked', sa.Boolean(), nullable=False),
+            sa.Column('created', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+            sa.Column('updated', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_user_tg_id'), 'user', ['tg_id'], unique=True)
+
+    if 'goal' not in tables:
+        op.create_table(
+            'goal',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('name', sa.String(length=128), nullable=False),
+            sa.Column('current_value', sa.Integer(), nullable=False),
+            sa.Column('selected_value', sa.Integer(), nullable=False),
+            sa.Column('period_end', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('created', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+            sa.Column('updated', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('goal')
+    op.drop_index(op.f('ix_user_tg_id'), table_name='user')
+    op.drop_table('user')
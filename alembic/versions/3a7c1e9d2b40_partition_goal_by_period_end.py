@@ -0,0 +1,115 @@
+"""partition goal by period_end
+
+Revision ID: 3a7c1e9d2b40
+Revises: 1c0e5a7f3b21
+Create Date: 2024-11-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a7c1e9d2b40'
+down_revision: Union[str, None] = '1c0e5a7f3b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def is_goal_partitioned() -> bool:
+    return op.get_bind().execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+        "JOIN pg_class ON pg_partitioned_table.partrelid = pg_class.oid "
+        "WHERE pg_class.relname = 'goal')"
+    )).scalar()
+
+
+def upgrade() -> None:
+    # Повторный запуск на уже секционированной таблице ничего не делает
+    if is_goal_partitioned():
+        return
+
+    op.rename_table('goal', 'goal_legacy')
+    op.execute('ALTER TABLE goal_legacy DROP CONSTRAINT IF EXISTS goal_pkey')
+    op.execute('ALTER TABLE goal_legacy DROP CONSTRAINT IF EXISTS goal_user_id_fkey')
+
+    op.create_table(
+        'goal',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(length=128), nullable=False),
+        sa.Column('current_value', sa.Integer(), nullable=False),
+        sa.Column('selected_value', sa.Integer(), nullable=False),
+        sa.Column('period_end', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id', 'period_end'),
+        postgresql_partition_by='RANGE (period_end)'
+    )
+
+    # Секции для всех месяцев, встречающихся в истории, плюс текущий и следующий месяц.
+    # Остальные месяцы создает задача app.database.partitions.run_goal_partition_job.
+    op.execute("""
+        DO $$
+        DECLARE
+            month_start timestamptz;
+        BEGIN
+            FOR month_start IN
+                SELECT DISTINCT date_trunc('month', period_end, 'UTC') FROM goal_legacy
+                UNION
+                SELECT date_trunc('month', now(), 'UTC') + make_interval(months => n)
+                FROM generate_series(0, 1) AS n
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF goal FOR VALUES FROM (%L) TO (%L)',
+                    'goal_y' || to_char(month_start AT TIME ZONE 'UTC', 'YYYY"m"MM'),
+                    month_start,
+                    month_start + interval '1 month'
+                );
+            END LOOP;
+        END $$;
+    """)
+
+    op.execute("""
+        INSERT INTO goal (id, name, current_value, selected_value, period_end, user_id, created, updated)
+        SELECT id, name, current_value, selected_value, period_end, user_id, created, updated
+        FROM goal_legacy
+    """)
+    op.execute("""
+        SELECT setval(pg_get_serial_sequence('goal', 'id'), COALESCE((SELECT max(id) FROM goal), 0) + 1, false)
+    """)
+    op.drop_table('goal_legacy')
+
+
+def downgrade() -> None:
+    if not is_goal_partitioned():
+        return
+
+    op.rename_table('goal', 'goal_partitioned')
+
+    op.create_table(
+        'goal',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(length=128), nullable=False),
+        sa.Column('current_value', sa.Integer(), nullable=False),
+        sa.Column('selected_value', sa.Integer(), nullable=False),
+        sa.Column('period_end', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("""
+        INSERT INTO goal (id, name, current_value, selected_value, period_end, user_id, created, updated)
+        SELECT id, name, current_value, selected_value, period_end, user_id, created, updated
+        FROM goal_partitioned
+    """)
+    op.execute("""
+        SELECT setval(pg_get_serial_sequence('goal', 'id'), COALESCE((SELECT max(id) FROM goal), 0) + 1, false)
+    """)
+    # Удаление родительской таблицы удаляет и все подключенные секции
+    op.drop_table('goal_partitioned')
@@ -0,0 +1,29 @@
+"""add user timezone
+
+Revision ID: 8d2f4b6a1c93
+Revises: 3a7c1e9d2b40
+Create Date: 2024-12-02 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2f4b6a1c93'
+down_revision: Union[str, None] = '3a7c1e9d2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column('timezone', sa.String(length=64), server_default='UTC', nullable=False))
+    # Индекс на секционированной таблице создается во всех текущих и будущих секциях
+    op.create_index('ix_goal_user_id_period_end', 'goal', ['user_id', 'period_end'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_goal_user_id_period_end', table_name='goal')
+    op.drop_column('user', 'timezone')
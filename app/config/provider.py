@@ -2,10 +2,47 @@ from environs import Env
 from pydantic import BaseModel
 
 
+class BotSessionInfo(BaseModel):
+    connection_limit: int = 100
+    limit_per_host: int = 0
+    keepalive_timeout: float = 30
+    request_timeout: int = 60
+    max_retries: int = 3
+    metrics_interval: int = 5 * 60
+
+
 class RedisInfo(BaseModel):
     host: str
     port: int
     db: int
+    socket_timeout: float = 2
+    socket_connect_timeout: float = 2
+
+
+class FsmStorageInfo(BaseModel):
+    state_ttl: int = 30 * 24 * 60 * 60
+    data_ttl: int = 30 * 24 * 60 * 60
+    dialog_ttl: int = 7 * 24 * 60 * 60
+    compaction_interval: int = 60 * 60
+    compaction_batch_size: int = 200
+    memory_budget_mb: int = 256
+
+
+class UpdateProcessingInfo(BaseModel):
+    dedup_ttl: int = 24 * 60 * 60
+    user_lock_timeout: int = 60
+
+
+class ResilienceInfo(BaseModel):
+    db_read_timeout: float = 3
+    db_write_timeout: float = 5
+    storage_timeout: float = 2
+    failure_threshold: int = 5
+    reset_timeout: float = 30
+    goal_cache_size: int = 10000
+    write_queue_size: int = 1000
+    write_replay_attempts: int = 5
+    replay_interval: float = 10
 
 
 class DbInfo(BaseModel):
@@ -14,15 +51,30 @@ class DbInfo(BaseModel):
     host: str
     port: int = 5432
     db_name: str
+    connect_timeout: float = 5
+    command_timeout: float = 10
+    pool_timeout: float = 5
 
     def get_connection_str(self):
         return f"postgresql+asyncpg://{self.username}:{self.password}@{self.host}:{self.port}/{self.db_name}"
 
 
+class GoalPartitionInfo(BaseModel):
+    months_ahead: int = 2
+    retention_months: int = 12
+    archive_schema: str = 'archive'
+    archive_tablespace: str | None = None
+
+
 class Config(BaseModel):
     token: str
+    bot_session_info: BotSessionInfo = BotSessionInfo()
     redis_info: RedisInfo
+    fsm_storage_info: FsmStorageInfo = FsmStorageInfo()
+    update_processing_info: UpdateProcessingInfo = UpdateProcessingInfo()
     db_info: DbInfo
+    resilience_info: ResilienceInfo = ResilienceInfo()
+    goal_partition_info: GoalPartitionInfo = GoalPartitionInfo()
 
 
 def get_config(env_path: str | None = None) -> Config:
@@ -31,10 +83,32 @@ def get_config(env_path: str | None = None) -> Config:
 
     return Config(
         token=env('BOT_TOKEN'),
+        bot_session_info=BotSessionInfo(
+            connection_limit=env.int('BOT_CONNECTION_LIMIT', 100),
+            limit_per_host=env.int('BOT_CONNECTION_LIMIT_PER_HOST', 0),
+            keepalive_timeout=env.float('BOT_KEEPALIVE_TIMEOUT', 30),
+            request_timeout=env.int('BOT_REQUEST_TIMEOUT', 60),
+            max_retries=env.int('BOT_MAX_RETRIES', 3),
+            metrics_interval=env.int('BOT_METRICS_INTERVAL', 5 * 60),
+        ),
         redis_info=RedisInfo(
             host=env('REDIS_HOST'),
             port=env('REDIS_PORT'),
-            db=env('REDIS_DB')
+            db=env('REDIS_DB'),
+            socket_timeout=env.float('REDIS_SOCKET_TIMEOUT', 2),
+            socket_connect_timeout=env.float('REDIS_SOCKET_CONNECT_TIMEOUT', 2),
+        ),
+        fsm_storage_info=FsmStorageInfo(
+            state_ttl=env.int('FSM_STATE_TTL', 30 * 24 * 60 * 60),
+            data_ttl=env.int('FSM_DATA_TTL', 30 * 24 * 60 * 60),
+            dialog_ttl=env.int('FSM_DIALOG_TTL', 7 * 24 * 60 * 60),
+            compaction_interval=env.int('FSM_COMPACTION_INTERVAL', 60 * 60),
+            compaction_batch_size=env.int('FSM_COMPACTION_BATCH_SIZE', 200),
+            memory_budget_mb=env.int('FSM_MEMORY_BUDGET_MB', 256),
+        ),
+        update_processing_info=UpdateProcessingInfo(
+            dedup_ttl=env.int('UPDATE_DEDUP_TTL', 24 * 60 * 60),
+            user_lock_timeout=env.int('UPDATE_USER_LOCK_TIMEOUT', 60),
         ),
         db_info=DbInfo(
             username=env('POSTGRES_USER'),
@@ -42,6 +116,26 @@ def get_config(env_path: str | None = None) -> Config:
             host=env('POSTGRES_HOST'),
             port=env('POSTGRES_PORT'),
             db_name=env('POSTGRES_DB_NAME'),
+            connect_timeout=env.float('POSTGRES_CONNECT_TIMEOUT', 5),
+            command_timeout=env.float('POSTGRES_COMMAND_TIMEOUT', 10),
+            pool_timeout=env.float('POSTGRES_POOL_TIMEOUT', 5),
+        ),
+        resilience_info=ResilienceInfo(
+            db_read_timeout=env.float('DB_READ_TIMEOUT', 3),
+            db_write_timeout=env.float('DB_WRITE_TIMEOUT', 5),
+            storage_timeout=env.float('STORAGE_TIMEOUT', 2),
+            failure_threshold=env.int('CIRCUIT_FAILURE_THRESHOLD', 5),
+            reset_timeout=env.float('CIRCUIT_RESET_TIMEOUT', 30),
+            goal_cache_size=env.int('GOAL_CACHE_SIZE', 10000),
+            write_queue_size=env.int('WRITE_QUEUE_SIZE', 1000),
+            write_replay_attempts=env.int('WRITE_REPLAY_ATTEMPTS', 5),
+            replay_interval=env.float('WRITE_REPLAY_INTERVAL', 10),
+        ),
+        goal_partition_info=GoalPartitionInfo(
+            months_ahead=env.int('GOAL_PARTITION_MONTHS_AHEAD', 2),
+            retention_months=env.int('GOAL_PARTITION_RETENTION_MONTHS', 12),
+            archive_schema=env('GOAL_PARTITION_ARCHIVE_SCHEMA', 'archive'),
+            archive_tablespace=env('GOAL_PARTITION_ARCHIVE_TABLESPACE', '') or None,
         )
     )
 
@@ -2,5 +2,13 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, Asyn
 
 from app.config.provider import config
 
-engine = create_async_engine(url=config.db_info.get_connection_str(), echo=True)
+engine = create_async_engine(
+    url=config.db_info.get_connection_str(),
+    echo=True,
+    pool_timeout=config.db_info.pool_timeout,
+    connect_args={
+        "timeout": config.db_info.connect_timeout,
+        "command_timeout": config.db_info.command_timeout,
+    }
+)
 session_maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
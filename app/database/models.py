@@ -42,6 +42,12 @@ class User(Base):
         Boolean,
         default=False
     )
+    timezone: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        default='UTC',
+        server_default='UTC'
+    )
 
     goals: Mapped[List["Goal"]] = relationship(
         back_populates="user",
@@ -52,6 +58,11 @@ class User(Base):
 
 class Goal(Base):
     __tablename__ = "goal"
+    # Таблица секционирована по месяцам period_end, ключ секционирования входит в первичный ключ
+    __table_args__ = (
+        Index("ix_goal_user_id_period_end", "user_id", "period_end"),
+        {"postgresql_partition_by": "RANGE (period_end)"},
+    )
 
     id: Mapped[int] = mapped_column(
         autoincrement=True,
@@ -79,6 +90,7 @@ class Goal(Base):
 
     period_end: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
+        primary_key=True,
         nullable=False,
         default=func.now()
     ) 
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import re
+from datetime import datetime, timezone
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config.provider import config
+from app.database.engine import engine
+from app.utils.periods import add_months, month_start
+
+logger = logging.getLogger(__name__)
+
+GOAL_TABLE = "goal"
+PARTITION_NAME_RE = re.compile(rf"^{GOAL_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+# Интервал между запусками задачи обслуживания секций
+PARTITION_JOB_INTERVAL = 6 * 60 * 60
+
+
+def get_partition_name(period_start: datetime) -> str:
+    """
+    Возвращает имя секции таблицы goal для месяца.
+
+    :param period_start: Начало месяца.
+    :return: Имя секции вида goal_y2024m11.
+    """
+    return f"{GOAL_TABLE}_y{period_start.year:04d}m{period_start.month:02d}"
+
+
+def parse_partition_name(name: str) -> datetime | None:
+    """
+    Возвращает начало месяца по имени секции или None, если имя не является секцией goal.
+
+    :param name: Имя таблицы.
+    :return: Начало месяца в UTC или None.
+    """
+    match = PARTITION_NAME_RE.match(name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+
+
+async def create_goal_partition(conn: AsyncConnection, period_start: datetime) -> str:
+    """
+    Создает секцию таблицы goal для месяца, если она еще не существует.
+
+    :param conn: Открытое соединение с базой данных.
+    :param period_start: Начало месяца.
+    :return: Имя секции.
+    """
+    period_start = month_start(period_start)
+    period_end = add_months(period_start, 1)
+    name = get_partition_name(period_start)
+    await conn.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{GOAL_TABLE}" '
+        f"FOR VALUES FROM ('{period_start.isoformat()}') TO ('{period_end.isoformat()}')"
+    ))
+    return name
+
+
+async def get_attached_goal_partitions(conn: AsyncConnection) -> List[str]:
+    """
+    Возвращает имена секций, подключенных к таблице goal.
+
+    :param conn: Открытое соединение с базой данных.
+    :return: Список имен секций.
+    """
+    result = await conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+        "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+        "WHERE parent.relname = :table"
+    ), {"table": GOAL_TABLE})
+    return [row[0] for row in result]
+
+
+async def get_detached_goal_partitions(conn: AsyncConnection) -> List[str]:
+    """
+    Возвращает имена секций goal, которые уже отключены, но еще не перенесены в архивную схему.
+
+    :param conn: Открытое соединение с базой данных.
+    :return: Список имен таблиц.
+    """
+    result = await conn.execute(text(
+        "SELECT pg_class.relname FROM pg_class "
+        "JOIN pg_namespace ON pg_class.relnamespace = pg_namespace.oid "
+        "WHERE pg_namespace.nspname = current_schema() AND pg_class.relkind = 'r' "
+        "AND NOT pg_class.relispartition AND pg_class.relname LIKE :pattern"
+    ), {"pattern": f"{GOAL_TABLE}\\_y%"})
+    return [row[0] for row in result if PARTITION_NAME_RE.match(row[0])]
+
+
+async def ensure_goal_partitions(months_ahead: int | None = None, now: datetime | None = None) -> List[str]:
+    """
+    Создает секции goal для текущего месяца и months_ahead следующих месяцев.
+
+    :param months_ahead: Количество месяцев вперед, по умолчанию из конфигурации.
+    :param now: Текущий момент, по умолчанию datetime.now(timezone.utc).
+    :return: Список имен секций, которые должны существовать.
+    """
+    months_ahead = config.goal_partition_info.months_ahead if months_ahead is None else months_ahead
+    now = now or datetime.now(timezone.utc)
+    names = []
+    try:
+        async with engine.begin() as conn:
+            for offset in range(months_ahead + 1):
+                names.append(await create_goal_partition(conn, add_months(now, offset)))
+        logger.info(f"Секции goal проверены: {', '.join(names)}.")
+    except SQLAlchemyError as e:
+        logger.error(f"Ошибка при создании секций goal: {e}")
+    return names
+
+
+async def detach_goal_partition(name: str):
+    """
+    Отключает секцию от таблицы goal.
+
+    На PostgreSQL 14+ используется DETACH PARTITION CONCURRENTLY в режиме autocommit,
+    который не берет ACCESS EXCLUSIVE блокировку на goal. На более старых версиях
+    секция отключается обычным DETACH в отдельной короткой транзакции.
+
+    :param name: Имя секции.
+    """
+    async with engine.connect() as conn:
+        if conn.dialect.server_version_info < (14,):
+            async with conn.begin():
+                await conn.execute(text(f'ALTER TABLE "{GOAL_TABLE}" DETACH PARTITION "{name}"'))
+            return
+
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        result = await conn.execute(text(
+            "SELECT pg_inherits.inhdetachpending FROM pg_inherits "
+            "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+            "WHERE child.relname = :name"
+        ), {"name": name})
+        # Прерванный DETACH CONCURRENTLY оставляет секцию в состоянии ожидания, его нужно завершить
+        if result.scalar():
+            await conn.execute(text(f'ALTER TABLE "{GOAL_TABLE}" DETACH PARTITION "{name}" FINALIZE'))
+        else:
+            await conn.execute(text(f'ALTER TABLE "{GOAL_TABLE}" DETACH PARTITION "{name}" CONCURRENTLY'))
+
+
+async def archive_goal_partitions(retention_months: int | None = None, now: datetime | None = None) -> List[str]:
+    """
+    Отключает секции goal старше retention_months месяцев и переносит их в архивную схему.
+
+    Каждая секция отключается отдельно, и только после этого переносится в архивную схему
+    и табличное пространство, чтобы копирование данных не блокировало запросы к goal.
+    Отключенные секции остаются доступны для чтения в архивной схеме.
+
+    :param retention_months: Сколько месяцев хранить в основной таблице, по умолчанию из конфигурации.
+    :param now: Текущий момент, по умолчанию datetime.now(timezone.utc).
+    :return: Список имен архивированных секций.
+    """
+    info = config.goal_partition_info
+    retention_months = info.retention_months if retention_months is None else retention_months
+    now = now or datetime.now(timezone.utc)
+    cutoff = add_months(now, -retention_months)
+    archived = []
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{info.archive_schema}"'))
+            attached = await get_attached_goal_partitions(conn)
+            # Секции, отключенные в прошлый раз, но не перенесенные из-за ошибки
+            detached = await get_detached_goal_partitions(conn)
+    except SQLAlchemyError as e:
+        logger.error(f"Ошибка при получении секций goal: {e}")
+        return []
+
+    for name in attached + detached:
+        period_start = parse_partition_name(name)
+        if period_start is None or period_start >= cutoff:
+            continue
+        try:
+            if name in attached:
+                await detach_goal_partition(name)
+            async with engine.begin() as conn:
+                await conn.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{info.archive_schema}"'))
+            if info.archive_tablespace:
+                async with engine.begin() as conn:
+                    await conn.execute(text(
+                        f'ALTER TABLE "{info.archive_schema}"."{name}" SET TABLESPACE "{info.archive_tablespace}"'
+                    ))
+            archived.append(name)
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при архивировании секции {name}: {e}")
+
+    if archived:
+        logger.info(f"Секции goal перенесены в архив: {', '.join(archived)}.")
+    return archived
+
+
+async def run_goal_partition_job(interval: float = PARTITION_JOB_INTERVAL):
+    """
+    Периодически создает секции goal на следующие месяцы и архивирует старые.
+
+    :param interval: Интервал между запусками в секундах.
+    """
+    while True:
+        try:
+            await ensure_goal_partitions()
+            await archive_goal_partitions()
+        except Exception as e:
+            # Ошибки соединения (например, ConnectionRefusedError) не являются SQLAlchemyError
+            logger.error(f"Ошибка при обслуживании секций goal: {e!r}")
+        await asyncio.sleep(interval)
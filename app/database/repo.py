@@ -1,17 +1,26 @@
 import logging
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 from typing import Optional, List
 
-from sqlalchemy import update
+from cachetools import LRUCache
+from sqlalchemy import Row, and_, update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import lazyload
 
+from app.config.provider import config
 from app.database.engine import session_maker
 from app.database.models import Goal, User
+from app.database.resilience import UNAVAILABLE_ERRORS, goal_cache, resilient_read, resilient_write
+from app.utils.periods import DEFAULT_TIMEZONE, get_period_end, is_valid_timezone
 
 logger = logging.getLogger(__name__)
 
+# Последние известные часовые пояса пользователей по tg_id. Устаревшее значение
+# не приводит к ошибке: get_user_goals сверяет его с часовым поясом из базы.
+user_timezones: LRUCache = LRUCache(maxsize=config.resilience_info.goal_cache_size)
+
 # Настройка логирования (если еще не настроено глобально)
 if not logger.hasHandlers():
     logging.basicConfig(
@@ -23,6 +32,7 @@ if not logger.hasHandlers():
     )
 
 
+@resilient_write(default=None)
 async def add_user(tg_id: int, name: str) -> Optional[User]:
     """
     Добавляет нового пользователя или обновляет существующего, разблокируя его.
@@ -34,7 +44,7 @@ async def add_user(tg_id: int, name: str) -> Optional[User]:
     async with session_maker() as session:
         try:
             async with session.begin():
-                stmt = select(User).where(User.tg_id == tg_id).limit(1)
+                stmt = select(User).options(lazyload(User.goals)).where(User.tg_id == tg_id).limit(1)
                 result = await session.execute(stmt)
                 user = result.scalar_one_or_none()
 
@@ -46,12 +56,15 @@ async def add_user(tg_id: int, name: str) -> Optional[User]:
                     session.add(user)
                     logger.info(f"Добавлен новый пользователь с tg_id={tg_id} и именем '{name}'.")
                 return user
+        except UNAVAILABLE_ERRORS:
+            raise
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при добавлении/обновлении пользователя с tg_id={tg_id}: {e}")
             await session.rollback()
             return None
 
 
+@resilient_write(default=False)
 async def set_user_blocked(tg_id: int) -> bool:
     """
     Блокирует пользователя с заданным tg_id.
@@ -63,7 +76,7 @@ async def set_user_blocked(tg_id: int) -> bool:
     async with session_maker() as session:
         try:
             async with session.begin():
-                stmt = select(User).where(User.tg_id == tg_id).limit(1)
+                stmt = select(User).options(lazyload(User.goals)).where(User.tg_id == tg_id).limit(1)
                 result = await session.execute(stmt)
                 user = result.scalar_one_or_none()
                 if user:
@@ -74,15 +87,88 @@ async def set_user_blocked(tg_id: int) -> bool:
                     logger.warning(f"Пользователь с tg_id={tg_id} не найден.")
                     return False
 
+        except UNAVAILABLE_ERRORS:
+            raise
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при блокировке пользователя с tg_id={tg_id}: {e}")
             await session.rollback()
             return False
 
 
+@resilient_write(default=False)
+async def set_user_timezone(tg_id: int, tz_name: str) -> bool:
+    """
+    Устанавливает часовой пояс пользователя, по которому считаются границы периодов целей.
+
+    :param tg_id: Telegram ID пользователя.
+    :param tz_name: Часовой пояс IANA, например Asia/Yekaterinburg.
+    :return: True, если операция успешна, False в противном случае.
+    """
+    if not is_valid_timezone(tz_name):
+        logger.warning(f"Неизвестный часовой пояс '{tz_name}' для пользователя с tg_id={tg_id}.")
+        return False
+
+    async with session_maker() as session:
+        try:
+            async with session.begin():
+                stmt = select(User.id, User.timezone).where(User.tg_id == tg_id).limit(1)
+                result = await session.execute(stmt)
+                user = result.one_or_none()
+
+                if user is None:
+                    logger.warning(f"Пользователь с tg_id={tg_id} не найден. Часовой пояс не установлен.")
+                    return False
+
+                if user.timezone != tz_name:
+                    await session.execute(update(User).where(User.id == user.id).values(timezone=tz_name))
+                    # Цели текущего периода переносятся на конец периода в новом часовом поясе
+                    await session.execute(
+                        update(Goal)
+                        .where(Goal.user_id == user.id, Goal.period_end == get_period_end(user.timezone))
+                        .values(period_end=get_period_end(tz_name))
+                    )
+                user_timezones[tg_id] = tz_name
+
+                logger.info(f"Установлен часовой пояс '{tz_name}' для пользователя с tg_id={tg_id}.")
+                return True
+        except UNAVAILABLE_ERRORS:
+            raise
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при установке часового пояса для пользователя с tg_id={tg_id}: {e}")
+            await session.rollback()
+            return False
+
+
+async def select_current_goals(session: AsyncSession, tg_id: int, tz_name: str) -> List[Row]:
+    """
+    Выбирает пользователя вместе с его целями, period_end которых совпадает с концом текущего периода в tz_name.
+
+    Равенство по period_end отсекает все секции goal, кроме одной, и идет по индексу (user_id, period_end).
+
+    :param session: Открытая сессия.
+    :param tg_id: Telegram ID пользователя.
+    :param tz_name: Часовой пояс, по которому считается конец текущего периода.
+    :return: Строки (timezone, Goal); Goal равен None, если целей нет. Пустой список, если пользователь не найден.
+    """
+    stmt = (
+        select(User.timezone, Goal)
+        .select_from(User)
+        .outerjoin(Goal, and_(Goal.user_id == User.id, Goal.period_end == get_period_end(tz_name)))
+        .options(lazyload(Goal.user))
+        .where(User.tg_id == tg_id)
+        .order_by(Goal.id)
+    )
+    result = await session.execute(stmt)
+    return list(result.all())
+
+
+@resilient_read(
+    fallback=goal_cache.get_user_goals,
+    on_result=lambda goals, tg_id: goal_cache.set_user_goals(tg_id, goals)
+)
 async def get_user_goals(tg_id: int) -> List[Goal]:
     """
-    Получает список целей пользователя по его tg_id.
+    Получает список целей пользователя за текущий период по его tg_id.
 
     :param tg_id: Telegram ID пользователя.
     :return: Список объектов Goal. Пустой список, если пользователь не найден или у него нет целей.
@@ -90,22 +176,31 @@ async def get_user_goals(tg_id: int) -> List[Goal]:
     async with session_maker() as session:
         try:
             async with session.begin():
-                stmt = select(User).options(selectinload(User.goals)).where(User.tg_id == tg_id).limit(1)
-                result = await session.execute(stmt)
-                user = result.scalar_one_or_none()
-                
-                if user:
-                    logger.info(f"Найден пользователь с tg_id={tg_id} и {len(user.goals)} целей.")
-                    return user.goals
-                else:
+                # Часовой пояс берется из кэша или считается UTC. Запрос возвращает фактический
+                # часовой пояс пользователя, и если догадка неверна, цели перечитываются еще раз.
+                tz_name = user_timezones.get(tg_id, DEFAULT_TIMEZONE)
+                rows = await select_current_goals(session, tg_id, tz_name)
+                if not rows:
                     logger.warning(f"Пользователь с tg_id={tg_id} не найден.")
                     return []
+
+                if rows[0].timezone != tz_name:
+                    tz_name = rows[0].timezone
+                    rows = await select_current_goals(session, tg_id, tz_name)
+                user_timezones[tg_id] = tz_name
+                goals = [row.Goal for row in rows if row.Goal is not None]
+
+                logger.info(f"Найдено {len(goals)} целей пользователя с tg_id={tg_id} за текущий период.")
+                return goals
+        except UNAVAILABLE_ERRORS:
+            raise
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при получении целей пользователя с tg_id={tg_id}: {e}")
             await session.rollback()
             return []
 
 
+@resilient_write(default=None)
 async def add_goal(tg_id: int, name: str, selected_value: int) -> Optional[Goal]:
     """
     Добавляет новую цель пользователю с заданным tg_id.
@@ -117,41 +212,48 @@ async def add_goal(tg_id: int, name: str, selected_value: int) -> Optional[Goal]
     """
     async with session_maker() as session:
         try:
-            now = datetime.now(timezone.utc)
-            # Определение последнего дня текущего месяца
-            next_month = now.replace(day=1) + timedelta(days=32)
-            last_day_of_month = next_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(seconds=1)
-
             async with session.begin():
-                stmt = select(User).options(selectinload(User.goals)).where(User.tg_id == tg_id).limit(1)
+                # Загружаем только id и часовой пояс пользователя, чтобы не поднимать всю историю целей
+                stmt = select(User.id, User.timezone).where(User.tg_id == tg_id).limit(1)
                 result = await session.execute(stmt)
-                user = result.scalar_one_or_none()
+                user = result.one_or_none()
                 
                 if user:
-                    new_goal = Goal(name=name, selected_value=selected_value, period_end=last_day_of_month)
-                    user.goals.append(new_goal)
+                    period_end = get_period_end(user.timezone)
+                    new_goal = Goal(name=name, selected_value=selected_value, period_end=period_end, user_id=user.id)
+                    session.add(new_goal)
                     logger.info(f"Добавлена цель '{name}' для пользователя с tg_id={tg_id}.")
                     return new_goal
                 else:
                     logger.warning(f"Пользователь с tg_id={tg_id} не найден. Цель не добавлена.")
                     return None
+        except UNAVAILABLE_ERRORS:
+            raise
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при добавлении цели '{name}' для пользователя с tg_id={tg_id}: {e}")
             await session.rollback()
             return None
 
 
-async def get_goal(goal_id: int) -> Optional[Goal]:
+@resilient_read(
+    fallback=lambda goal_id, period_end=None: goal_cache.get_goal(goal_id),
+    on_result=lambda goal, *args, **kwargs: goal_cache.set_goal(goal)
+)
+async def get_goal(goal_id: int, period_end: Optional[datetime] = None) -> Optional[Goal]:
     """
     Получает цель по её ID.
 
     :param goal_id: ID цели.
+    :param period_end: Конец периода цели. Если задан, запрос затрагивает только одну секцию goal.
     :return: Объект Goal, если найдено, иначе None.
     """
     async with session_maker() as session:
         try:
             async with session.begin():
-                stmt = select(Goal).where(Goal.id == goal_id).limit(1)
+                # Без lazyload(Goal.user) selectin-связь подняла бы пользователя и всю историю его целей
+                stmt = select(Goal).options(lazyload(Goal.user)).where(Goal.id == goal_id).limit(1)
+                if period_end is not None:
+                    stmt = stmt.where(Goal.period_end == period_end)
                 result = await session.execute(stmt)
                 goal = result.scalar_one_or_none()
                 
@@ -161,25 +263,35 @@ async def get_goal(goal_id: int) -> Optional[Goal]:
                     logger.warning(f"Цель с id={goal_id} не найдена.")
                 
                 return goal
+        except UNAVAILABLE_ERRORS:
+            raise
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при получении цели с id={goal_id}: {e}")
             await session.rollback()
             return None
 
 
-async def add_progress_to_goal(goal_id: int, progress: int) -> bool:
+@resilient_write(default=False)
+async def add_progress_to_goal(goal_id: int, progress: int, period_end: Optional[datetime] = None) -> bool:
     """
     Добавляет прогресс к текущему значению цели.
 
     :param goal_id: ID цели.
     :param progress: Значение прогресса для добавления.
+    :param period_end: Конец периода цели. Если задан, запрос затрагивает только одну секцию goal.
     :return: True, если операция успешна, False в противном случае.
     """
     async with session_maker() as session:
         try:
             async with session.begin():
                 stmt = update(Goal).where(Goal.id == goal_id).values(current_value=Goal.current_value + progress)
-                result = await session.execute(stmt)
+                if period_end is not None:
+                    result = await session.execute(stmt.where(Goal.period_end == period_end))
+                    # period_end из данных диалога мог устареть после смены часового пояса, ищем цель только по id
+                    if result.rowcount == 0:
+                        result = await session.execute(stmt)
+                else:
+                    result = await session.execute(stmt)
                 
                 if result.rowcount == 0:
                     logger.warning(f"Цель с id={goal_id} не найдена. Прогресс не добавлен.")
@@ -187,25 +299,35 @@ async def add_progress_to_goal(goal_id: int, progress: int) -> bool:
                 
                 logger.info(f"Добавлен прогресс {progress} к цели с id={goal_id}.")
                 return True
+        except UNAVAILABLE_ERRORS:
+            raise
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при добавлении прогресса к цели с id={goal_id}: {e}")
             await session.rollback()
             return False
 
 
-async def set_progress_to_goal(goal_id: int, progress: int) -> bool:
+@resilient_write(default=False)
+async def set_progress_to_goal(goal_id: int, progress: int, period_end: Optional[datetime] = None) -> bool:
     """
     Устанавливает текущее значение прогресса цели.
 
     :param goal_id: ID цели.
     :param progress: Новое значение прогресса.
+    :param period_end: Конец периода цели. Если задан, запрос затрагивает только одну секцию goal.
     :return: True, если операция успешна, False в противном случае.
     """
     async with session_maker() as session:
         try:
             async with session.begin():
                 stmt = update(Goal).where(Goal.id == goal_id).values(current_value=progress)
-                result = await session.execute(stmt)
+                if period_end is not None:
+                    result = await session.execute(stmt.where(Goal.period_end == period_end))
+                    # period_end из данных диалога мог устареть после смены часового пояса, ищем цель только по id
+                    if result.rowcount == 0:
+                        result = await session.execute(stmt)
+                else:
+                    result = await session.execute(stmt)
                 
                 if result.rowcount == 0:
                     logger.warning(f"Цель с id={goal_id} не найдена. Прогресс не установлен.")
@@ -213,6 +335,8 @@ async def set_progress_to_goal(goal_id: int, progress: int) -> bool:
                 
                 logger.info(f"Установлен прогресс {progress} для цели с id={goal_id}.")
                 return True
+        except UNAVAILABLE_ERRORS:
+            raise
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при установке прогресса для цели с id={goal_id}: {e}")
             await session.rollback()
@@ -0,0 +1,252 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Awaitable, Callable, Deque, List, Optional
+
+from cachetools import LRUCache
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+
+from app.config.provider import config
+from app.database.models import Goal
+from app.utils.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# Ошибки соединения с базой, а не ошибки конкретного запроса: с ними запись можно безопасно повторить.
+# Функции репозитория пробрасывают их наверх, чтобы их учитывал автомат.
+# ConnectionError (например, ConnectionRefusedError) asyncpg выбрасывает при подключении без обертки SQLAlchemy.
+UNAVAILABLE_ERRORS = (OperationalError, InterfaceError, PoolTimeoutError, ConnectionError)
+
+db_breaker = CircuitBreaker(
+    "postgres",
+    failure_threshold=config.resilience_info.failure_threshold,
+    reset_timeout=config.resilience_info.reset_timeout
+)
+
+
+class GoalCache:
+    """
+    Кэш последних прочитанных целей, из которого бот отвечает, пока база недоступна.
+    """
+
+    def __init__(self, maxsize: int):
+        self._user_goals: LRUCache = LRUCache(maxsize=maxsize)
+        self._goals: LRUCache = LRUCache(maxsize=maxsize)
+
+    def set_user_goals(self, tg_id: int, goals: List[Goal]):
+        self._user_goals[tg_id] = goals
+        for goal in goals:
+            self._goals[goal.id] = goal
+
+    def get_user_goals(self, tg_id: int) -> List[Goal]:
+        return self._user_goals.get(tg_id, [])
+
+    def set_goal(self, goal: Optional[Goal]):
+        if goal is not None:
+            self._goals[goal.id] = goal
+
+    def get_goal(self, goal_id: int) -> Optional[Goal]:
+        return self._goals.get(goal_id)
+
+
+class Queued:
+    """
+    Результат функции записи, отложенной в очередь: запись будет выполнена, когда база станет доступна.
+    """
+
+    def __repr__(self) -> str:
+        return "QUEUED"
+
+
+QUEUED = Queued()
+
+
+@dataclass
+class QueuedWrite:
+    func: Callable[..., Awaitable[Any]]
+    args: tuple
+    kwargs: dict
+    attempts: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.func.__name__}(args={self.args!r}, kwargs={self.kwargs!r})"
+
+
+class WriteQueue:
+    """
+    Очередь записей, отложенных на время недоступности базы.
+
+    При переполнении отбрасываются самые старые записи. Запись, которую не удалось
+    повторить max_attempts раз или которая упала не из-за недоступности базы,
+    отбрасывается с записью в лог, чтобы не блокировать очередь.
+    """
+
+    def __init__(self, maxsize: int, max_attempts: int):
+        self._items: Deque[QueuedWrite] = deque()
+        self._wakeup = asyncio.Event()
+        self.maxsize = maxsize
+        self.max_attempts = max_attempts
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, func: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict):
+        if len(self._items) >= self.maxsize:
+            dropped = self._items.popleft()
+            logger.error(f"Очередь записей переполнена, отброшена запись {dropped}.")
+        self._items.append(QueuedWrite(func, args, kwargs))
+
+    def wake(self):
+        """
+        Будит задачу повтора, чтобы она выполнила записи, не дожидаясь следующего интервала.
+        """
+        self._wakeup.set()
+
+    async def wait(self, timeout: float):
+        """
+        Ждет вызова wake или истечения timeout секунд.
+
+        :param timeout: Максимальное время ожидания в секундах.
+        """
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def replay(self, timeout: float) -> int:
+        """
+        Выполняет отложенные записи по порядку, пока база доступна.
+
+        :param timeout: Таймаут одной записи в секундах.
+        :return: Количество выполненных записей.
+        """
+        replayed = 0
+        while self._items and db_breaker.allow_request():
+            item = self._items[0]
+            try:
+                await asyncio.wait_for(item.func(*item.args, **item.kwargs), timeout)
+            except UNAVAILABLE_ERRORS as e:
+                db_breaker.record_failure()
+                item.attempts += 1
+                if item.attempts >= self.max_attempts:
+                    self._items.popleft()
+                    logger.error(f"Отложенная запись {item} отброшена после {item.attempts} неудачных попыток: {e!r}")
+                else:
+                    logger.warning(f"Повтор отложенной записи {item.func.__name__} не удался: {e!r}")
+                break
+            except asyncio.TimeoutError:
+                # Запись могла быть применена базой, повтор привел бы к двойному применению
+                db_breaker.record_failure()
+                self._items.popleft()
+                logger.error(f"Отложенная запись {item} отброшена: превышен таймаут, результат неизвестен.")
+                break
+            except Exception as e:
+                self._items.popleft()
+                logger.error(f"Отложенная запись {item} отброшена из-за ошибки: {e!r}")
+                continue
+            db_breaker.record_success()
+            self._items.popleft()
+            replayed += 1
+        if replayed:
+            logger.info(f"Выполнено {replayed} отложенных записей, в очереди осталось {len(self._items)}.")
+        return replayed
+
+
+goal_cache = GoalCache(maxsize=config.resilience_info.goal_cache_size)
+write_queue = WriteQueue(
+    maxsize=config.resilience_info.write_queue_size,
+    max_attempts=config.resilience_info.write_replay_attempts
+)
+
+
+def record_success():
+    """
+    Отмечает успешный запрос к базе и будит задачу повтора, если в очереди есть записи.
+    """
+    db_breaker.record_success()
+    if len(write_queue):
+        write_queue.wake()
+
+
+def resilient_read(fallback: Callable[..., Any], on_result: Optional[Callable[..., None]] = None):
+    """
+    Декоратор чтения: ограничивает время запроса и при недоступности базы возвращает fallback.
+
+    :param fallback: Функция с теми же аргументами, возвращающая значение из кэша.
+    :param on_result: Функция (результат, *аргументы), сохраняющая успешный результат в кэш.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not db_breaker.allow_request():
+                return fallback(*args, **kwargs)
+            try:
+                result = await asyncio.wait_for(func(*args, **kwargs), config.resilience_info.db_read_timeout)
+            except (*UNAVAILABLE_ERRORS, asyncio.TimeoutError) as e:
+                db_breaker.record_failure()
+                logger.warning(f"База недоступна при вызове {func.__name__}, ответ из кэша: {e!r}")
+                return fallback(*args, **kwargs)
+            record_success()
+            if on_result is not None:
+                on_result(result, *args, **kwargs)
+            return result
+        return wrapper
+    return decorator
+
+
+def resilient_write(default: Any):
+    """
+    Декоратор записи: ограничивает время запроса, а при недоступности базы
+    откладывает запись в очередь и возвращает QUEUED.
+
+    Пока в очереди есть записи, новые записи тоже ставятся в очередь, чтобы сохранить порядок;
+    если база при этом доступна, задача повтора выполняет очередь сразу.
+    Запись, прерванная по таймауту, могла уже быть применена базой, поэтому в очередь
+    она не ставится: вызов возвращает default без повтора.
+
+    :param default: Значение, возвращаемое, если запись не выполнена.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if len(write_queue):
+                write_queue.put(func, args, kwargs)
+                if not db_breaker.is_open:
+                    write_queue.wake()
+                logger.info(f"Запись {func.__name__} поставлена в очередь за отложенными записями.")
+                return QUEUED
+            if not db_breaker.allow_request():
+                write_queue.put(func, args, kwargs)
+                logger.info(f"Запись {func.__name__} отложена до восстановления базы.")
+                return QUEUED
+            try:
+                result = await asyncio.wait_for(func(*args, **kwargs), config.resilience_info.db_write_timeout)
+            except UNAVAILABLE_ERRORS as e:
+                db_breaker.record_failure()
+                write_queue.put(func, args, kwargs)
+                logger.warning(f"База недоступна при вызове {func.__name__}, запись отложена: {e!r}")
+                return QUEUED
+            except asyncio.TimeoutError:
+                db_breaker.record_failure()
+                logger.error(f"Превышен таймаут записи {func.__name__}, результат неизвестен, запись не повторяется.")
+                return default
+            record_success()
+            return result
+        return wrapper
+    return decorator
+
+
+async def run_write_replay_job(interval: Optional[float] = None):
+    """
+    Повторяет отложенные записи каждые interval секунд или сразу, когда база снова ответила.
+
+    :param interval: Интервал между попытками в секундах, по умолчанию из конфигурации.
+    """
+    interval = interval or config.resilience_info.replay_interval
+    while True:
+        await write_queue.wait(interval)
+        if len(write_queue):
+            await write_queue.replay(config.resilience_info.db_write_timeout)
@@ -14,6 +14,7 @@ from aiogram_dialog.widgets.input import MessageInput
 
 from app.database.models import Goal
 from app.database.repo import add_goal, add_progress_to_goal, get_user_goals, set_progress_to_goal
+from app.database.resilience import QUEUED
 from aiogram.enums.parse_mode import ParseMode
 
 logger = logging.getLogger(__name__)
@@ -112,8 +113,13 @@ async def add_goal_to_user(callback: CallbackQuery, button: Button, dialog_manag
     goal_limit = dialog_manager.dialog_data.get('goal_limit', 0)
 
     if new_goal and goal_limit > 0:
-        await add_goal(tg_id, new_goal, goal_limit)
-        await callback.message.answer("Цель успешно добавлена!")
+        goal = await add_goal(tg_id, new_goal, goal_limit)
+        if goal is QUEUED:
+            await callback.message.answer("Цель будет добавлена, как только база станет доступна.")
+        elif goal:
+            await callback.message.answer("Цель успешно добавлена!")
+        else:
+            await callback.message.answer("Ошибка при добавлении цели. Пожалуйста, попробуйте снова.")
     else:
         await callback.message.answer("Ошибка при добавлении цели. Пожалуйста, попробуйте снова.")
 
@@ -204,12 +210,25 @@ async def on_progress_enter(message: Message, mi: MessageInput, dialog_manager:
             await message.answer("Цель не выбрана.")
             return
 
+        goal = dialog_manager.dialog_data.get(f"goal_{selected_goal_id}") or {}
+        period_end = datetime.fromisoformat(goal['period_end']) if goal.get('period_end') else None
+
         if dialog_manager.dialog_data.get('edit_type') == 'add_progress':
-            await add_progress_to_goal(selected_goal_id, progress)
-            await message.answer(f"Прогресс {progress} добавлен к цели.")
+            result = await add_progress_to_goal(selected_goal_id, progress, period_end)
+            if result is QUEUED:
+                await message.answer(f"Прогресс {progress} будет добавлен, как только база станет доступна.")
+            elif result:
+                await message.answer(f"Прогресс {progress} добавлен к цели.")
+            else:
+                await message.answer("Не удалось добавить прогресс. Пожалуйста, попробуйте снова.")
         elif dialog_manager.dialog_data.get('edit_type') == 'set_progress':
-            await set_progress_to_goal(selected_goal_id, progress)
-            await message.answer(f"Прогресс цели установлен на {progress}.")
+            result = await set_progress_to_goal(selected_goal_id, progress, period_end)
+            if result is QUEUED:
+                await message.answer(f"Прогресс {progress} будет установлен, как только база станет доступна.")
+            elif result:
+                await message.answer(f"Прогресс цели установлен на {progress}.")
+            else:
+                await message.answer("Не удалось установить прогресс. Пожалуйста, попробуйте снова.")
 
         await dialog_manager.switch_to(GoalStates.goals_info)
     except ValueError:
@@ -1,10 +1,12 @@
 import logging
 
 from aiogram import Router
-from aiogram.filters import CommandStart
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.types import Message
 
-from app.database.repo import add_user
+from app.database.repo import add_user, set_user_timezone
+from app.database.resilience import QUEUED
+from app.utils.periods import is_valid_timezone
 
 logger = logging.getLogger(__name__)
 
@@ -15,3 +17,23 @@ router = Router()
 async def on_start_command(message: Message):
     await add_user(message.from_user.id, message.from_user.username)
     await message.answer(text="Вызови /goal для настройки своих целей")
+
+
+@router.message(Command('timezone'))
+async def on_timezone_command(message: Message, command: CommandObject):
+    tz_name = (command.args or '').strip()
+    if not tz_name:
+        await message.answer(text="Укажи часовой пояс, например: /timezone Asia/Yekaterinburg")
+        return
+
+    if not is_valid_timezone(tz_name):
+        await message.answer(text="Неизвестный часовой пояс. Проверь название, например Europe/Moscow")
+        return
+
+    result = await set_user_timezone(message.from_user.id, tz_name)
+    if result is QUEUED:
+        await message.answer(text=f"Часовой пояс {tz_name} будет установлен, как только база станет доступна")
+    elif result:
+        await message.answer(text=f"Часовой пояс установлен: {tz_name}")
+    else:
+        await message.answer(text="Не удалось установить часовой пояс, попробуй позже")
@@ -2,13 +2,20 @@ import asyncio
 
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.base import DefaultKeyBuilder
-from aiogram.fsm.storage.redis import RedisStorage
+from aiogram.fsm.storage.redis import RedisEventIsolation
 from aiogram.types import BotCommand, BotCommandScopeAllPrivateChats
 from aiogram_dialog import setup_dialogs
 from redis.asyncio import Redis
 
 from app.config.provider import config
+from app.database.partitions import run_goal_partition_job
+from app.database.resilience import run_write_replay_job
 from app.handlers import goal_handler, start_handler
+from app.middlewares.update_middleware import UpdateDedupMiddleware
+from app.storage.compaction import run_fsm_compaction_job
+from app.storage.redis_storage import ResilientEventIsolation, ResilientStorage, TTLRedisStorage
+from app.utils.bot_session import ScheduledAiohttpSession, run_send_metrics_job
+from app.utils.circuit_breaker import CircuitBreaker
 from app.utils.logging import setup_logging_base_config
 
 log_file_path = 'logs/app.log'
@@ -16,15 +23,52 @@ setup_logging_base_config(log_file_path)
 
 
 async def main():
-    bot = Bot(token=config.token)
+    session = ScheduledAiohttpSession()
+    bot = Bot(token=config.token, session=session)
 
     await bot.set_my_commands([
         BotCommand(command="/help", description="Поддержка"),
     ], BotCommandScopeAllPrivateChats())
 
-    redis = Redis(host=config.redis_info.host, port=config.redis_info.port, db=config.redis_info.db)
+    redis = Redis(
+        host=config.redis_info.host,
+        port=config.redis_info.port,
+        db=config.redis_info.db,
+        socket_timeout=config.redis_info.socket_timeout,
+        socket_connect_timeout=config.redis_info.socket_connect_timeout
+    )
+
+    key_builder = DefaultKeyBuilder(with_destiny=True)
+    redis_breaker = CircuitBreaker(
+        "redis",
+        failure_threshold=config.resilience_info.failure_threshold,
+        reset_timeout=config.resilience_info.reset_timeout
+    )
+    storage = ResilientStorage(
+        storage=TTLRedisStorage(
+            redis=redis,
+            key_builder=key_builder,
+            state_ttl=config.fsm_storage_info.state_ttl,
+            data_ttl=config.fsm_storage_info.data_ttl,
+            dialog_ttl=config.fsm_storage_info.dialog_ttl
+        ),
+        breaker=redis_breaker,
+        timeout=config.resilience_info.storage_timeout
+    )
+
+    # Блокировка на пользователя берется до чтения состояния FSM и общая для всех воркеров;
+    # ее же использует aiogram_dialog для стека диалогов
+    events_isolation = ResilientEventIsolation(
+        isolation=RedisEventIsolation(
+            redis=redis,
+            key_builder=key_builder,
+            lock_kwargs={"timeout": config.update_processing_info.user_lock_timeout}
+        ),
+        breaker=redis_breaker
+    )
 
-    dp = Dispatcher(storage=RedisStorage(redis=redis, key_builder=DefaultKeyBuilder(with_destiny=True)))
+    dp = Dispatcher(storage=storage, events_isolation=events_isolation)
+    dp.update.outer_middleware(UpdateDedupMiddleware(redis, redis_breaker))
     dp.include_routers(
         start_handler.router,
         goal_handler.router
@@ -32,7 +76,17 @@ async def main():
     
     setup_dialogs(dp)
 
-    await dp.start_polling(bot)
+    jobs = [
+        asyncio.create_task(run_goal_partition_job()),
+        asyncio.create_task(run_fsm_compaction_job(redis)),
+        asyncio.create_task(run_send_metrics_job(session)),
+        asyncio.create_task(run_write_replay_job()),
+    ]
+    try:
+        await dp.start_polling(bot)
+    finally:
+        for job in jobs:
+            job.cancel()
 
 
 if __name__ == '__main__':
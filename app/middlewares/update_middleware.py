@@ -0,0 +1,90 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.config.provider import UpdateProcessingInfo, config
+from app.utils.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# Каждый ключ - битовая карта на 2^16 update_id (8 КБ), бит выставлен для обработанного update_id
+DEDUP_BLOCK_BITS = 16
+
+
+class UpdateDedupMiddleware(BaseMiddleware):
+    """
+    Внешний middleware для Update: пропускает повторно доставленные апдейты.
+
+    Обработанные update_id хранятся в битовых картах Redis с TTL, поэтому дубликаты
+    отсекаются и при нескольких воркерах. Очередность апдейтов одного пользователя
+    обеспечивает RedisEventIsolation диспетчера.
+
+    Пока автомат Redis разомкнут, апдейты обрабатываются без дедупликации и без обращения к Redis.
+    """
+
+    def __init__(
+            self,
+            redis: Redis,
+            breaker: CircuitBreaker,
+            info: Optional[UpdateProcessingInfo] = None,
+            prefix: str = "updates"
+    ):
+        self.redis = redis
+        self.breaker = breaker
+        self.info = info or config.update_processing_info
+        self.prefix = prefix
+
+    def _dedup_key(self, bot_id: int, update_id: int) -> str:
+        return f"{self.prefix}:{bot_id}:seen:{update_id >> DEDUP_BLOCK_BITS}"
+
+    async def _mark_seen(self, key: str, offset: int) -> bool:
+        """
+        Отмечает апдейт обработанным.
+
+        :return: True, если апдейт уже был отмечен ранее.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.setbit(key, offset, 1)
+            pipe.expire(key, self.info.dedup_ttl)
+            previous, _ = await pipe.execute()
+        return bool(previous)
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any],
+    ) -> Any:
+        bot_id = data["bot"].id
+        key = self._dedup_key(bot_id, event.update_id)
+        offset = event.update_id & ((1 << DEDUP_BLOCK_BITS) - 1)
+
+        if not self.breaker.allow_request():
+            return await handler(event, data)
+
+        try:
+            seen = await self._mark_seen(key, offset)
+        except (RedisError, OSError) as e:
+            # Без Redis апдейт обрабатывается без дедупликации, чтобы не ждать его
+            self.breaker.record_failure()
+            logger.warning(f"Redis недоступен, апдейт {event.update_id} обрабатывается без дедупликации: {e!r}")
+            return await handler(event, data)
+        self.breaker.record_success()
+
+        if seen:
+            logger.info(f"Апдейт {event.update_id} уже обработан, пропускаем.")
+            return None
+
+        try:
+            return await handler(event, data)
+        except Exception:
+            # Снимаем отметку, чтобы повторная доставка апдейта могла его обработать
+            try:
+                await self.redis.setbit(key, offset, 0)
+            except (RedisError, OSError):
+                pass
+            raise
@@ -0,0 +1,233 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+from redis.asyncio import Redis
+
+from app.config.provider import config
+from app.storage.redis_storage import DIALOG_CONTEXT_DESTINY, DIALOG_STACK_DESTINY, get_keyspace
+
+logger = logging.getLogger(__name__)
+
+# Пауза между пачками, чтобы компактизация не занимала Redis надолго
+BATCH_PAUSE = 0.05
+# Минимальное время простоя ключа диалога, после которого он может считаться осиротевшим
+ORPHAN_GRACE_PERIOD = 10 * 60
+
+
+class KeyspaceStats(BaseModel):
+    keys: int = 0
+    memory_bytes: int = 0
+
+
+class CompactionReport(BaseModel):
+    keyspaces: Dict[str, KeyspaceStats] = {}
+    expired_set: int = 0
+    removed: int = 0
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(stats.memory_bytes for stats in self.keyspaces.values())
+
+
+def parse_key(key: str) -> Tuple[str, str, str]:
+    """
+    Разбирает ключ DefaultKeyBuilder(with_destiny=True) на части.
+
+    :param key: Ключ Redis вида <prefix>:<chat_id>:<user_id>:<destiny>:<part>.
+    :return: Кортеж (база ключа без destiny, destiny, part).
+    """
+    body, _, part = key.rpartition(":")
+    if ":aiogd:" in body:
+        base, _, rest = body.partition(":aiogd:")
+        return base, f"aiogd:{rest}", part
+    base, _, destiny = body.rpartition(":")
+    return base, destiny, part
+
+
+async def scan_batches(redis: Redis, match: str, batch_size: int) -> AsyncIterator[List[str]]:
+    """
+    Итерирует ключи Redis пачками через SCAN, не блокируя сервер.
+
+    :param redis: Клиент Redis.
+    :param match: Шаблон ключей.
+    :param batch_size: Подсказка COUNT для SCAN.
+    """
+    cursor = 0
+    while True:
+        cursor, keys = await redis.scan(cursor=cursor, match=match, count=batch_size)
+        if keys:
+            yield [key.decode("utf-8") if isinstance(key, bytes) else key for key in keys]
+        if cursor == 0:
+            break
+
+
+def is_idle(ttl: int, dialog_ttl: int) -> bool:
+    """
+    Проверяет, что ключ диалога не обновлялся как минимум ORPHAN_GRACE_PERIOD секунд.
+
+    TTL выставляется заново при каждой записи, поэтому время простоя равно dialog_ttl - ttl.
+    """
+    return ttl >= 0 and dialog_ttl - ttl >= ORPHAN_GRACE_PERIOD
+
+
+async def find_orphans(redis: Redis, keys: List[str], ttls: List[int], dialog_ttl: int) -> List[str]:
+    """
+    Находит осиротевшие стеки и контексты диалогов в пачке ключей.
+
+    Стек осиротел, если ни один из его интентов больше не существует.
+    Контекст осиротел, если его стек удален или больше не ссылается на него.
+
+    :return: Список ключей для удаления.
+    """
+    candidates = [
+        key for key, ttl in zip(keys, ttls)
+        if key.endswith(":data")
+        and get_keyspace(parse_key(key)[1]) in ("dialog_stack", "dialog_context")
+        and is_idle(ttl, dialog_ttl)
+    ]
+    if not candidates:
+        return []
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for key in candidates:
+            pipe.get(key)
+        values = await pipe.execute()
+
+    # Для каждого кандидата собираем связанные ключи; для контекста запоминаем id его интента
+    checks: List[Tuple[str, Optional[str], List[str]]] = []
+    for key, value in zip(candidates, values):
+        if value is None:
+            continue
+        base, destiny, part = parse_key(key)
+        data = json.loads(value)
+        if destiny.startswith(DIALOG_STACK_DESTINY):
+            intents = data.get("intents") or []
+            if intents:
+                checks.append((key, None, [f"{base}:{DIALOG_CONTEXT_DESTINY}{intent}:{part}" for intent in intents]))
+        else:
+            stack_key = f"{base}:{DIALOG_STACK_DESTINY}{data.get('_stack_id', '')}:{part}"
+            checks.append((key, data.get("_intent_id", ""), [stack_key]))
+
+    if not checks:
+        return []
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for _, intent_id, related in checks:
+            if intent_id is None:
+                pipe.exists(*related)
+            else:
+                pipe.get(related[0])
+        results = await pipe.execute()
+
+    orphans = []
+    for (key, intent_id, _), result in zip(checks, results):
+        if intent_id is None:
+            if result == 0:
+                orphans.append(key)
+        elif result is None or intent_id not in (json.loads(result).get("intents") or []):
+            orphans.append(key)
+    return orphans
+
+
+async def compact_fsm_storage(
+        redis: Redis,
+        prefix: str = "fsm",
+        batch_size: Optional[int] = None,
+        dialog_ttl: Optional[int] = None,
+        state_ttl: Optional[int] = None,
+        data_ttl: Optional[int] = None,
+) -> CompactionReport:
+    """
+    Проходит по ключам FSM через SCAN, выставляет TTL ключам без него,
+    удаляет осиротевшие стеки и контексты диалогов и собирает статистику по пространствам ключей.
+
+    :param redis: Клиент Redis.
+    :param prefix: Префикс ключей DefaultKeyBuilder.
+    :param batch_size: Размер пачки SCAN, по умолчанию из конфигурации.
+    :param dialog_ttl: TTL ключей диалогов, по умолчанию из конфигурации.
+    :param state_ttl: TTL ключей состояния FSM, по умолчанию из конфигурации.
+    :param data_ttl: TTL ключей данных FSM, по умолчанию из конфигурации.
+    :return: Отчет о компактизации.
+    """
+    info = config.fsm_storage_info
+    batch_size = batch_size or info.compaction_batch_size
+    dialog_ttl = dialog_ttl or info.dialog_ttl
+    state_ttl = state_ttl or info.state_ttl
+    data_ttl = data_ttl or info.data_ttl
+    report = CompactionReport()
+
+    async for keys in scan_batches(redis, f"{prefix}:*", batch_size):
+        async with redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.ttl(key)
+                pipe.memory_usage(key, samples=0)
+            results = await pipe.execute()
+        ttls = results[0::2]
+        memory = results[1::2]
+
+        expire_keys = []
+        for key, ttl, size in zip(keys, ttls, memory):
+            _, destiny, part = parse_key(key)
+            keyspace = "lock" if part == "lock" else get_keyspace(destiny)
+            stats = report.keyspaces.setdefault(keyspace, KeyspaceStats())
+            stats.keys += 1
+            stats.memory_bytes += size or 0
+            # Блокировки истекают сами, остальные ключи без TTL записаны до появления TTLRedisStorage
+            if ttl == -1 and keyspace != "lock":
+                # TTL выбирается так же, как в TTLRedisStorage.get_ttl
+                if keyspace.startswith("dialog"):
+                    expire_keys.append((key, dialog_ttl))
+                else:
+                    expire_keys.append((key, state_ttl if part == "state" else data_ttl))
+
+        orphans = await find_orphans(redis, keys, ttls, dialog_ttl)
+
+        if expire_keys or orphans:
+            async with redis.pipeline(transaction=False) as pipe:
+                for key, ttl in expire_keys:
+                    pipe.expire(key, ttl)
+                if orphans:
+                    pipe.unlink(*orphans)
+                await pipe.execute()
+        report.expired_set += len(expire_keys)
+        report.removed += len(orphans)
+
+        await asyncio.sleep(BATCH_PAUSE)
+
+    return report
+
+
+def log_report(report: CompactionReport, memory_budget_mb: Optional[int] = None):
+    """
+    Пишет отчет о компактизации в лог и предупреждает о превышении бюджета памяти.
+
+    :param report: Отчет о компактизации.
+    :param memory_budget_mb: Бюджет памяти в мегабайтах, по умолчанию из конфигурации.
+    """
+    memory_budget_mb = memory_budget_mb or config.fsm_storage_info.memory_budget_mb
+    for keyspace, stats in sorted(report.keyspaces.items()):
+        logger.info(f"Redis keyspace '{keyspace}': {stats.keys} ключей, {stats.memory_bytes} байт.")
+    logger.info(f"Компактизация FSM: выставлен TTL для {report.expired_set} ключей, удалено {report.removed} ключей.")
+
+    budget_bytes = memory_budget_mb * 1024 * 1024
+    if report.memory_bytes > budget_bytes:
+        logger.warning(f"Ключи FSM занимают {report.memory_bytes} байт при бюджете {budget_bytes} байт.")
+
+
+async def run_fsm_compaction_job(redis: Redis, interval: Optional[float] = None):
+    """
+    Периодически запускает компактизацию хранилища FSM.
+
+    :param redis: Клиент Redis.
+    :param interval: Интервал между запусками в секундах, по умолчанию из конфигурации.
+    """
+    interval = interval or config.fsm_storage_info.compaction_interval
+    while True:
+        try:
+            log_report(await compact_fsm_storage(redis))
+        except Exception as e:
+            logger.error(f"Ошибка при компактизации хранилища FSM: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import DEFAULT_DESTINY, BaseEventIsolation, BaseStorage, StorageKey, StateType
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
+from aiogram.fsm.storage.redis import RedisStorage
+from redis.exceptions import RedisError
+
+from app.utils.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DIALOG_STACK_DESTINY = "aiogd:stack:"
+DIALOG_CONTEXT_DESTINY = "aiogd:context:"
+
+
+def get_keyspace(destiny: str) -> str:
+    """
+    Определяет пространство ключей по destiny ключа хранилища.
+
+    :param destiny: destiny из StorageKey или из имени ключа Redis.
+    :return: "dialog_stack", "dialog_context", "fsm" или "other".
+    """
+    if destiny.startswith(DIALOG_STACK_DESTINY):
+        return "dialog_stack"
+    if destiny.startswith(DIALOG_CONTEXT_DESTINY):
+        return "dialog_context"
+    if destiny == DEFAULT_DESTINY:
+        return "fsm"
+    return "other"
+
+
+class TTLRedisStorage(RedisStorage):
+    """
+    RedisStorage, который выставляет TTL на каждую запись FSM и aiogram_dialog.
+
+    Стеки и контексты диалогов получают отдельный, обычно более короткий TTL,
+    чтобы брошенные диалоги не оставались в Redis навсегда.
+    """
+
+    def __init__(self, *args: Any, dialog_ttl: Optional[int] = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.dialog_ttl = dialog_ttl
+
+    def get_ttl(self, key: StorageKey, part: str) -> Optional[int]:
+        """
+        Возвращает TTL для записи хранилища.
+
+        :param key: Ключ хранилища.
+        :param part: "state" или "data".
+        :return: TTL в секундах или None, если TTL не задан.
+        """
+        if get_keyspace(key.destiny) in ("dialog_stack", "dialog_context") and self.dialog_ttl:
+            return self.dialog_ttl
+        return self.state_ttl if part == "state" else self.data_ttl
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        redis_key = self.key_builder.build(key, "state")
+        if state is None:
+            await self.redis.delete(redis_key)
+        else:
+            await self.redis.set(
+                redis_key,
+                state.state if isinstance(state, State) else state,
+                ex=self.get_ttl(key, "state"),
+            )
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        redis_key = self.key_builder.build(key, "data")
+        if not data:
+            await self.redis.delete(redis_key)
+            return
+        await self.redis.set(
+            redis_key,
+            self.json_dumps(data),
+            ex=self.get_ttl(key, "data"),
+        )
+
+
+class ResilientStorage(BaseStorage):
+    """
+    Обертка над хранилищем FSM с таймаутом на каждую операцию и автоматом.
+
+    Пока основное хранилище недоступно, состояние хранится в памяти процесса,
+    чтобы диалоги продолжали работать, а обработчики не ждали Redis.
+    """
+
+    def __init__(self, storage: BaseStorage, breaker: CircuitBreaker, timeout: float):
+        self.storage = storage
+        self.breaker = breaker
+        self.timeout = timeout
+        self.fallback = MemoryStorage()
+
+    async def _call(self, name: str, primary: Callable[[], Awaitable[T]], fallback: Callable[[], Awaitable[T]]) -> T:
+        if not self.breaker.allow_request():
+            return await fallback()
+        try:
+            result = await asyncio.wait_for(primary(), self.timeout)
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            self.breaker.record_failure()
+            logger.warning(f"Хранилище FSM недоступно при вызове {name}, используется память процесса: {e!r}")
+            return await fallback()
+        self.breaker.record_success()
+        return result
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._call(
+            "set_state",
+            lambda: self.storage.set_state(key, state),
+            lambda: self.fallback.set_state(key, state)
+        )
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self._call(
+            "get_state",
+            lambda: self.storage.get_state(key),
+            lambda: self.fallback.get_state(key)
+        )
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self._call(
+            "set_data",
+            lambda: self.storage.set_data(key, data),
+            lambda: self.fallback.set_data(key, data)
+        )
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return await self._call(
+            "get_data",
+            lambda: self.storage.get_data(key),
+            lambda: self.fallback.get_data(key)
+        )
+
+    async def close(self) -> None:
+        await self.storage.close()
+        await self.fallback.close()
+
+
+class ResilientEventIsolation(BaseEventIsolation):
+    """
+    Обертка над блокировкой событий пользователя с автоматом.
+
+    Пока основная блокировка недоступна, события изолируются блокировкой в памяти процесса,
+    чтобы апдейты продолжали обрабатываться вместе с ResilientStorage.
+    """
+
+    def __init__(self, isolation: BaseEventIsolation, breaker: CircuitBreaker):
+        self.isolation = isolation
+        self.breaker = breaker
+        self.fallback = SimpleEventIsolation()
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        if self.breaker.allow_request():
+            lock = self.isolation.lock(key)
+            try:
+                await lock.__aenter__()
+            except (RedisError, OSError) as e:
+                self.breaker.record_failure()
+                logger.warning(f"Блокировка событий недоступна, используется память процесса: {e!r}")
+            else:
+                self.breaker.record_success()
+                try:
+                    yield None
+                finally:
+                    try:
+                        await lock.__aexit__(None, None, None)
+                    except (RedisError, OSError) as e:
+                        logger.warning(f"Не удалось снять блокировку событий {key}: {e!r}")
+                return
+
+        async with self.fallback.lock(key):
+            yield None
+
+    async def close(self) -> None:
+        await self.isolation.close()
+        await self.fallback.close()
@@ -0,0 +1,213 @@
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from pydantic import BaseModel
+
+from app.config.provider import BotSessionInfo, config
+
+logger = logging.getLogger(__name__)
+
+
+class SendMetrics(BaseModel):
+    queue_depth: int = 0
+    in_flight: int = 0
+    paused_chats: int = 0
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    latency_avg: float = 0.0
+    latency_max: float = 0.0
+
+
+class ChatSlot:
+    """
+    Очередь отправки в один чат: сохраняет порядок запросов и хранит момент, до которого чат на паузе.
+    """
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.resume_at = 0.0
+        self.waiters = 0
+
+
+class SendScheduler(BaseRequestMiddleware):
+    """
+    Планировщик исходящих запросов к Telegram.
+
+    Запросы в один чат выполняются по очереди, запросы в разные чаты - параллельно,
+    но не больше max_concurrency одновременно (0 - без ограничения, как limit в aiohttp). При 429 на паузу ставится только тот чат,
+    в который пришел retry_after, либо все запросы, если у метода нет chat_id.
+    """
+
+    def __init__(self, max_concurrency: int, max_retries: int):
+        self.max_retries = max_retries
+        if max_concurrency < 0:
+            raise ValueError(f"max_concurrency должен быть неотрицательным, получено {max_concurrency}")
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self._chats: Dict[Any, ChatSlot] = {}
+        self._global_resume_at = 0.0
+        self._queue_depth = 0
+        self._in_flight = 0
+        self._sent = 0
+        self._failed = 0
+        self._retries = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def prune_idle_slots(self) -> int:
+        """
+        Удаляет очереди чатов без ожидающих запросов, пауза которых уже закончилась.
+
+        Слот чата, получившего 429, остается после последней отправки до окончания паузы,
+        и если в чат больше ничего не отправляется, удалить его может только эта очистка.
+
+        :return: Количество удаленных слотов.
+        """
+        now = time.monotonic()
+        idle = [chat_id for chat_id, slot in self._chats.items() if slot.waiters == 0 and slot.resume_at <= now]
+        for chat_id in idle:
+            del self._chats[chat_id]
+        return len(idle)
+
+    def get_metrics(self) -> SendMetrics:
+        """
+        Возвращает снимок метрик отправки и заодно удаляет простаивающие очереди чатов.
+
+        :return: Объект SendMetrics.
+        """
+        self.prune_idle_slots()
+        now = time.monotonic()
+        return SendMetrics(
+            queue_depth=self._queue_depth,
+            in_flight=self._in_flight,
+            paused_chats=sum(1 for slot in self._chats.values() if slot.resume_at > now),
+            sent=self._sent,
+            failed=self._failed,
+            retries=self._retries,
+            latency_avg=self._latency_total / self._sent if self._sent else 0.0,
+            latency_max=self._latency_max,
+        )
+
+    async def _wait_resume(self, slot: Optional[ChatSlot]):
+        while True:
+            resume_at = max(self._global_resume_at, slot.resume_at if slot else 0.0)
+            delay = resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    async def _send(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+            slot: Optional[ChatSlot],
+    ) -> Response[TelegramType]:
+        attempt = 0
+        while True:
+            await self._wait_resume(slot)
+            async with self._semaphore or contextlib.nullcontext():
+                self._queue_depth -= 1
+                self._in_flight += 1
+                started = time.monotonic()
+                try:
+                    response = await make_request(bot, method)
+                except TelegramRetryAfter as e:
+                    if attempt >= self.max_retries:
+                        self._failed += 1
+                        raise
+                    attempt += 1
+                    self._retries += 1
+                    resume_at = time.monotonic() + e.retry_after
+                    if slot is not None:
+                        slot.resume_at = resume_at
+                    else:
+                        self._global_resume_at = resume_at
+                    logger.warning(
+                        f"Flood control для {type(method).__name__} в чате {getattr(method, 'chat_id', None)}, "
+                        f"повтор через {e.retry_after} с."
+                    )
+                    continue
+                except Exception:
+                    self._failed += 1
+                    raise
+                finally:
+                    self._in_flight -= 1
+                    # До следующей попытки или выхода из __call__ запрос снова считается ожидающим
+                    self._queue_depth += 1
+
+                latency = time.monotonic() - started
+                self._sent += 1
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+                return response
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        self._queue_depth += 1
+        try:
+            if chat_id is None:
+                return await self._send(make_request, bot, method, None)
+
+            slot = self._chats.setdefault(chat_id, ChatSlot())
+            slot.waiters += 1
+            try:
+                async with slot.lock:
+                    return await self._send(make_request, bot, method, slot)
+            finally:
+                slot.waiters -= 1
+                if slot.waiters == 0 and slot.resume_at <= time.monotonic():
+                    self._chats.pop(chat_id, None)
+        finally:
+            self._queue_depth -= 1
+
+
+class ScheduledAiohttpSession(AiohttpSession):
+    """
+    Сессия aiohttp с настраиваемым пулом соединений и планировщиком отправки SendScheduler.
+    """
+
+    def __init__(self, info: Optional[BotSessionInfo] = None, **kwargs: Any) -> None:
+        info = info or config.bot_session_info
+        super().__init__(limit=info.connection_limit, timeout=info.request_timeout, **kwargs)
+        self._connector_init.update(
+            limit_per_host=info.limit_per_host,
+            keepalive_timeout=info.keepalive_timeout,
+        )
+        self.scheduler = SendScheduler(max_concurrency=info.connection_limit, max_retries=info.max_retries)
+        self.middleware(self.scheduler)
+
+    def get_metrics(self) -> SendMetrics:
+        return self.scheduler.get_metrics()
+
+
+async def run_send_metrics_job(session: ScheduledAiohttpSession, interval: Optional[float] = None):
+    """
+    Периодически пишет метрики отправки в лог.
+
+    :param session: Сессия бота.
+    :param interval: Интервал между записями в секундах, по умолчанию из конфигурации.
+    """
+    interval = interval or config.bot_session_info.metrics_interval
+    while True:
+        await asyncio.sleep(interval)
+        metrics = session.get_metrics()
+        logger.info(
+            f"Отправка в Telegram: очередь {metrics.queue_depth}, в работе {metrics.in_flight}, "
+            f"на паузе {metrics.paused_chats} чатов, отправлено {metrics.sent}, ошибок {metrics.failed}, "
+            f"повторов {metrics.retries}, задержка avg {metrics.latency_avg:.3f} с / max {metrics.latency_max:.3f} с."
+        )
@@ -0,0 +1,57 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель для внешней зависимости.
+
+    После failure_threshold ошибок подряд автомат размыкается и reset_timeout секунд
+    отклоняет вызовы сразу. Затем пропускается один пробный вызов: при успехе автомат
+    замыкается, при ошибке снова размыкается.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_started_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow_request(self) -> bool:
+        """
+        Проверяет, можно ли выполнить вызов.
+
+        :return: True, если автомат замкнут или пора выполнить пробный вызов.
+        """
+        if self._opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self._opened_at < self.reset_timeout:
+            return False
+        # Пробный вызов, который так и не завершился, не должен держать автомат разомкнутым вечно
+        if self._probe_started_at is not None and now - self._probe_started_at < self.reset_timeout:
+            return False
+        self._probe_started_at = now
+        return True
+
+    def record_success(self):
+        if self._opened_at is not None:
+            logger.info(f"Автомат '{self.name}' замкнут, зависимость снова доступна.")
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started_at = None
+
+    def record_failure(self):
+        self._failures += 1
+        if self._probe_started_at is not None or (self._opened_at is None and self._failures >= self.failure_threshold):
+            logger.error(f"Автомат '{self.name}' разомкнут после {self._failures} ошибок подряд.")
+            self._opened_at = time.monotonic()
+        self._probe_started_at = None
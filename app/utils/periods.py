@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_TIMEZONE = 'UTC'
+
+
+def month_start(moment: datetime) -> datetime:
+    """
+    Возвращает начало месяца (00:00:00 первого числа) для заданного момента.
+
+    :param moment: Момент времени с часовым поясом.
+    :return: Начало месяца в том же часовом поясе.
+    """
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    """
+    Сдвигает начало месяца на заданное количество месяцев.
+
+    :param moment: Момент времени с часовым поясом.
+    :param months: Количество месяцев, может быть отрицательным.
+    :return: Начало месяца, сдвинутого на months.
+    """
+    index = moment.year * 12 + (moment.month - 1) + months
+    return month_start(moment).replace(year=index // 12, month=index % 12 + 1)
+
+
+@lru_cache(maxsize=None)
+def get_zone(tz_name: str) -> ZoneInfo:
+    return ZoneInfo(tz_name)
+
+
+def is_valid_timezone(tz_name: str) -> bool:
+    """
+    Проверяет, что tz_name - известный часовой пояс IANA, например Asia/Yekaterinburg.
+    """
+    try:
+        get_zone(tz_name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError, OSError):
+        # Для имен каталогов tzdata (например, Europe) ZoneInfo выбрасывает IsADirectoryError
+        return False
+
+
+@lru_cache(maxsize=4096)
+def get_period_bounds(tz_name: str, year: int, month: int) -> tuple[datetime, datetime]:
+    """
+    Возвращает границы месяца в часовом поясе tz_name, переведенные в UTC.
+
+    Границы вычисляются один раз на пару (часовой пояс, месяц) и дальше берутся из кэша.
+
+    :param tz_name: Часовой пояс IANA.
+    :param year: Год.
+    :param month: Месяц.
+    :return: Кортеж (начало периода, начало следующего периода) в UTC.
+    """
+    period_start = datetime(year, month, 1, tzinfo=get_zone(tz_name))
+    next_period_start = add_months(period_start, 1)
+    return period_start.astimezone(timezone.utc), next_period_start.astimezone(timezone.utc)
+
+
+def get_current_period(tz_name: str = DEFAULT_TIMEZONE, now: datetime | None = None) -> tuple[datetime, datetime]:
+    """
+    Возвращает границы текущего периода целей в часовом поясе пользователя:
+    [начало местного месяца, начало следующего местного месяца).
+
+    :param tz_name: Часовой пояс пользователя.
+    :param now: Текущий момент, по умолчанию datetime.now(timezone.utc).
+    :return: Кортеж (начало периода, начало следующего периода) в UTC.
+    """
+    now = now or datetime.now(timezone.utc)
+    local_now = now.astimezone(get_zone(tz_name))
+    return get_period_bounds(tz_name, local_now.year, local_now.month)
+
+
+def get_period_end(tz_name: str = DEFAULT_TIMEZONE, now: datetime | None = None) -> datetime:
+    """
+    Возвращает последний момент текущего периода (последняя секунда местного месяца).
+
+    :param tz_name: Часовой пояс пользователя.
+    :param now: Текущий момент, по умолчанию datetime.now(timezone.utc).
+    :return: Значение period_end для новой цели в UTC.
+    """
+    _, next_period_start = get_current_period(tz_name, now)
+    return next_period_start - timedelta(seconds=1)
@@ -0,0 +1,181 @@
+"""
+Бенчмарки слоя репозитория app/database/repo.py.
+
+База задается переменной BENCH_DATABASE_URL (по умолчанию SQLite-файл рядом с тестами),
+объем данных - BENCH_USERS и BENCH_GOALS. Заполненная база переиспользуется между запусками,
+пока не изменится схема моделей: тогда таблицы пересоздаются и заполняются заново.
+
+Сохранить результаты как базовые и сравнить с ними после изменений:
+
+    pytest tests/benchmarks --benchmark-autosave
+    pytest tests/benchmarks --benchmark-compare --benchmark-compare-fail=mean:20%
+"""
+import asyncio
+import hashlib
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import MetaData, PrimaryKeyConstraint, event, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.database import repo
+from app.database.models import Base, Goal, User
+from app.database.partitions import create_goal_partition
+from app.utils.periods import add_months, get_period_end
+
+BENCH_DIR = os.path.dirname(__file__)
+DATABASE_URL = os.environ.get('BENCH_DATABASE_URL', f"sqlite+aiosqlite:///{os.path.join(BENCH_DIR, 'bench.sqlite3')}")
+USERS = int(os.environ.get('BENCH_USERS', 100_000))
+GOALS = int(os.environ.get('BENCH_GOALS', 1_000_000))
+# История целей каждого пользователя распределена по HISTORY_MONTHS месяцам, включая текущий
+HISTORY_MONTHS = 12
+SEED_CHUNK = 50_000
+TG_ID_OFFSET = 10_000_000
+
+# Таблица с хэшем схемы, по которой заполнена база
+SCHEMA_TABLE = 'bench_schema'
+
+
+def get_tg_id(user_id: int) -> int:
+    return TG_ID_OFFSET + user_id
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+
+def get_metadata(dialect_name: str) -> MetaData:
+    """
+    Возвращает схему моделей для диалекта базы бенчмарков.
+
+    В SQLite нет автоинкремента для составного первичного ключа, поэтому в копии схемы
+    первичный ключ goal сужается до id. Остальные колонки и индексы берутся из моделей.
+    """
+    if dialect_name != 'sqlite':
+        return Base.metadata
+
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    goal = metadata.tables[Goal.__tablename__]
+    goal.c.period_end.primary_key = False
+    goal.append_constraint(PrimaryKeyConstraint(goal.c.id))
+    return metadata
+
+
+def get_schema_hash(metadata: MetaData, dialect) -> str:
+    ddl = []
+    for table in metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=dialect)))
+        ddl.extend(str(CreateIndex(index).compile(dialect=dialect)) for index in sorted(table.indexes, key=lambda i: i.name))
+    return hashlib.sha256('\n'.join(ddl).encode()).hexdigest()
+
+
+async def create_schema(engine, now: datetime):
+    metadata = get_metadata(engine.dialect.name)
+    schema_hash = get_schema_hash(metadata, engine.dialect)
+    async with engine.begin() as conn:
+        await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} (schema_hash VARCHAR(64) NOT NULL)"))
+        current_hash = (await conn.execute(text(f"SELECT schema_hash FROM {SCHEMA_TABLE}"))).scalar()
+        if current_hash != schema_hash:
+            # База заполнена по другой схеме моделей: пересоздаем таблицы, seed заполнит их заново
+            await conn.run_sync(metadata.drop_all)
+            await conn.execute(text(f"DELETE FROM {SCHEMA_TABLE}"))
+            await conn.execute(text(f"INSERT INTO {SCHEMA_TABLE} (schema_hash) VALUES (:schema_hash)"), {"schema_hash": schema_hash})
+        await conn.run_sync(metadata.create_all)
+        if engine.dialect.name != 'sqlite':
+            for offset in range(-HISTORY_MONTHS, 2):
+                await create_goal_partition(conn, add_months(now, offset))
+
+
+async def seed(engine, now: datetime):
+    async with engine.begin() as conn:
+        users = (await conn.execute(select(func.count()).select_from(User))).scalar_one()
+        goals = (await conn.execute(select(func.count()).select_from(Goal))).scalar_one()
+    if users == USERS and goals == GOALS:
+        return
+
+    async with engine.begin() as conn:
+        await conn.execute(Goal.__table__.delete())
+        await conn.execute(User.__table__.delete())
+        for start in range(1, USERS + 1, SEED_CHUNK):
+            await conn.execute(insert(User), [
+                {"id": user_id, "tg_id": get_tg_id(user_id), "tg_name": f"user_{user_id}", "is_blocked": False}
+                for user_id in range(start, min(start + SEED_CHUNK, USERS + 1))
+            ])
+
+        period_ends = [get_period_end(now=add_months(now, -offset)) for offset in range(HISTORY_MONTHS)]
+        for start in range(0, GOALS, SEED_CHUNK):
+            await conn.execute(insert(Goal), [
+                {
+                    "id": goal_id + 1,
+                    "name": f"goal_{goal_id}",
+                    "current_value": goal_id % 50,
+                    "selected_value": 100,
+                    "period_end": period_ends[(goal_id // USERS) % HISTORY_MONTHS],
+                    "user_id": goal_id % USERS + 1,
+                }
+                for goal_id in range(start, min(start + SEED_CHUNK, GOALS))
+            ])
+        if engine.dialect.name != 'sqlite':
+            await conn.execute(text(
+                "SELECT setval(pg_get_serial_sequence('goal', 'id'), (SELECT max(id) FROM goal))"
+            ))
+
+
+@pytest.fixture(scope='session')
+def bench_loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope='session')
+def bench_engine(bench_loop):
+    engine = create_async_engine(DATABASE_URL)
+    now = datetime.now(timezone.utc)
+    bench_loop.run_until_complete(create_schema(engine, now))
+    bench_loop.run_until_complete(seed(engine, now))
+    yield engine
+    bench_loop.run_until_complete(engine.dispose())
+
+
+@pytest.fixture(scope='session', autouse=True)
+def bench_session_maker(bench_engine):
+    original = repo.session_maker
+    repo.session_maker = async_sessionmaker(bind=bench_engine, class_=AsyncSession, expire_on_commit=False)
+    yield repo.session_maker
+    repo.session_maker = original
+
+
+@pytest.fixture
+def run(bench_loop):
+    """
+    Выполняет корутину в общем цикле событий бенчмарков.
+    """
+    return bench_loop.run_until_complete
+
+
+@pytest.fixture
+def count_statements(bench_engine):
+    """
+    Контекстный менеджер, считающий SQL-запросы, отправленные в базу внутри блока.
+    """
+    @contextmanager
+    def counter():
+        listener = StatementCounter()
+        event.listen(bench_engine.sync_engine, 'before_cursor_execute', listener)
+        try:
+            yield listener
+        finally:
+            event.remove(bench_engine.sync_engine, 'before_cursor_execute', listener)
+    return counter
@@ -0,0 +1,123 @@
+import itertools
+
+from sqlalchemy import delete, update
+
+from app.database import repo
+from app.database.models import Goal, User
+from app.utils.periods import get_period_end
+from tests.benchmarks.conftest import GOALS, USERS, get_tg_id
+
+# Пользователь из середины таблицы, чтобы не попадать в "горячее" начало индекса
+USER_ID = USERS // 2
+TG_ID = get_tg_id(USER_ID)
+# Цель пользователя USER_ID в текущем периоде (см. распределение в conftest.seed)
+GOAL_ID = USER_ID
+
+
+def test_add_user_existing(benchmark, run, count_statements):
+    with count_statements() as counter:
+        user = run(repo.add_user(TG_ID, f"user_{USER_ID}"))
+    assert user is not None
+    assert counter.count == 1, counter.statements
+
+    benchmark(lambda: run(repo.add_user(TG_ID, f"user_{USER_ID}")))
+
+
+def test_add_user_new(run, count_statements, bench_session_maker):
+    tg_id = get_tg_id(USERS + 1)
+    try:
+        with count_statements() as counter:
+            user = run(repo.add_user(tg_id, "new_user"))
+        assert user is not None
+        assert counter.count == 2, counter.statements
+    finally:
+        async def cleanup():
+            async with bench_session_maker() as session, session.begin():
+                await session.execute(delete(User).where(User.tg_id == tg_id))
+        run(cleanup())
+
+
+def test_set_user_blocked(benchmark, run, count_statements, bench_session_maker):
+    async def unblock():
+        async with bench_session_maker() as session, session.begin():
+            await session.execute(update(User).where(User.id == USER_ID).values(is_blocked=False))
+
+    try:
+        with count_statements() as counter:
+            assert run(repo.set_user_blocked(TG_ID)) is True
+        assert counter.count == 2, counter.statements
+
+        benchmark(lambda: run(repo.set_user_blocked(TG_ID)))
+    finally:
+        run(unblock())
+
+
+def test_get_user_goals(benchmark, run, count_statements):
+    with count_statements() as counter:
+        goals = run(repo.get_user_goals(TG_ID))
+    assert [goal.id for goal in goals] == [GOAL_ID]
+    assert counter.count == 1, counter.statements
+
+    benchmark(lambda: run(repo.get_user_goals(TG_ID)))
+
+
+def test_set_user_timezone(benchmark, run, count_statements):
+    timezones = itertools.cycle(['UTC', 'Asia/Yekaterinburg'])
+    try:
+        with count_statements() as counter:
+            assert run(repo.set_user_timezone(TG_ID, 'Asia/Yekaterinburg')) is True
+        assert counter.count == 3, counter.statements
+        # Цели текущего периода перенесены на конец периода в новом часовом поясе
+        assert [goal.id for goal in run(repo.get_user_goals(TG_ID))] == [GOAL_ID]
+
+        benchmark(lambda: run(repo.set_user_timezone(TG_ID, next(timezones))))
+    finally:
+        run(repo.set_user_timezone(TG_ID, 'UTC'))
+
+
+def test_add_goal(benchmark, run, count_statements, bench_session_maker):
+    try:
+        with count_statements() as counter:
+            goal = run(repo.add_goal(TG_ID, "benchmark", 10))
+        assert goal is not None
+        assert counter.count == 2, counter.statements
+
+        benchmark(lambda: run(repo.add_goal(TG_ID, "benchmark", 10)))
+    finally:
+        async def cleanup():
+            async with bench_session_maker() as session, session.begin():
+                await session.execute(delete(Goal).where(Goal.id > GOALS))
+        run(cleanup())
+
+
+def test_get_goal(benchmark, run, count_statements):
+    with count_statements() as counter:
+        goal = run(repo.get_goal(GOAL_ID))
+    assert goal is not None and goal.id == GOAL_ID
+    assert counter.count == 1, counter.statements
+
+    benchmark(lambda: run(repo.get_goal(GOAL_ID)))
+
+
+def test_add_progress_to_goal(benchmark, run, count_statements):
+    with count_statements() as counter:
+        assert run(repo.add_progress_to_goal(GOAL_ID, 1)) is True
+    assert counter.count == 1, counter.statements
+
+    benchmark(lambda: run(repo.add_progress_to_goal(GOAL_ID, 1)))
+
+
+def test_set_progress_to_goal(benchmark, run, count_statements):
+    with count_statements() as counter:
+        assert run(repo.set_progress_to_goal(GOAL_ID, 0)) is True
+    assert counter.count == 1, counter.statements
+
+    benchmark(lambda: run(repo.set_progress_to_goal(GOAL_ID, 0)))
+
+
+def test_add_progress_to_goal_stale_period_end(run, count_statements):
+    # period_end из данных диалога, сохраненный до смены часового пояса
+    stale_period_end = get_period_end('Asia/Yekaterinburg')
+    with count_statements() as counter:
+        assert run(repo.add_progress_to_goal(GOAL_ID, 1, stale_period_end)) is True
+    assert counter.count == 2, counter.statements
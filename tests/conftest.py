@@ -0,0 +1,14 @@
+"""
+Общие настройки тестов: переменные окружения по умолчанию, без которых не загружается app.config.provider.
+"""
+import os
+
+os.environ.setdefault('BOT_TOKEN', '0:test')
+os.environ.setdefault('REDIS_HOST', 'localhost')
+os.environ.setdefault('REDIS_PORT', '6379')
+os.environ.setdefault('REDIS_DB', '0')
+os.environ.setdefault('POSTGRES_USER', 'postgres')
+os.environ.setdefault('POSTGRES_PASSWORD', 'password')
+os.environ.setdefault('POSTGRES_HOST', 'localhost')
+os.environ.setdefault('POSTGRES_PORT', '5432')
+os.environ.setdefault('POSTGRES_DB_NAME', 'running_speed_db')
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.database import resilience
+from app.database.resilience import QUEUED, WriteQueue, resilient_write
+from app.utils.circuit_breaker import CircuitBreaker
+
+
+def unavailable() -> OperationalError:
+    return OperationalError("SELECT 1", {}, ConnectionRefusedError("connection refused"))
+
+
+class FakeWrite:
+    """
+    Функция записи, которая по очереди выбрасывает заданные ошибки и запоминает успешные вызовы.
+    """
+
+    def __init__(self, *errors: BaseException | None):
+        self.errors = list(errors)
+        self.applied = []
+        self.__name__ = "fake_write"
+
+    async def __call__(self, value):
+        error = self.errors.pop(0) if self.errors else None
+        if isinstance(error, asyncio.TimeoutError):
+            await asyncio.sleep(1)
+        elif error is not None:
+            raise error
+        self.applied.append(value)
+        return True
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=100, reset_timeout=30)
+    monkeypatch.setattr(resilience, "db_breaker", breaker)
+    return breaker
+
+
+@pytest.fixture
+def queue(monkeypatch, breaker):
+    queue = WriteQueue(maxsize=10, max_attempts=3)
+    monkeypatch.setattr(resilience, "write_queue", queue)
+    monkeypatch.setattr(resilience.config.resilience_info, "db_write_timeout", 0.05)
+    return queue
+
+
+def test_replay_keeps_order(queue):
+    write = FakeWrite()
+    for value in range(3):
+        queue.put(write, (value,), {})
+
+    assert asyncio.run(queue.replay(timeout=0.05)) == 3
+    assert write.applied == [0, 1, 2]
+    assert len(queue) == 0
+
+
+def test_put_drops_oldest_when_full(queue):
+    write = FakeWrite()
+    for value in range(queue.maxsize + 2):
+        queue.put(write, (value,), {})
+
+    asyncio.run(queue.replay(timeout=0.05))
+    assert write.applied == list(range(2, queue.maxsize + 2))
+
+
+def test_replay_stops_at_head_while_unavailable(queue):
+    write = FakeWrite(unavailable())
+    queue.put(write, (1,), {})
+    queue.put(write, (2,), {})
+
+    assert asyncio.run(queue.replay(timeout=0.05)) == 0
+    assert len(queue) == 2
+
+    assert asyncio.run(queue.replay(timeout=0.05)) == 2
+    assert write.applied == [1, 2]
+
+
+def test_replay_drops_entry_after_max_attempts(queue):
+    write = FakeWrite(*[unavailable()] * queue.max_attempts)
+    queue.put(write, (1,), {})
+    queue.put(write, (2,), {})
+
+    for _ in range(queue.max_attempts):
+        asyncio.run(queue.replay(timeout=0.05))
+    assert len(queue) == 1
+
+    asyncio.run(queue.replay(timeout=0.05))
+    assert write.applied == [2]
+
+
+def test_replay_drops_timed_out_entry(queue, breaker):
+    write = FakeWrite(asyncio.TimeoutError())
+    queue.put(write, (1,), {})
+    queue.put(write, (2,), {})
+
+    assert asyncio.run(queue.replay(timeout=0.05)) == 0
+    assert len(queue) == 1
+    assert breaker._failures == 1
+
+    asyncio.run(queue.replay(timeout=0.05))
+    assert write.applied == [2]
+
+
+def test_replay_drops_failed_entry_and_continues(queue):
+    write = FakeWrite(ValueError("bad arguments"))
+    queue.put(write, (1,), {})
+    queue.put(write, (2,), {})
+
+    assert asyncio.run(queue.replay(timeout=0.05)) == 1
+    assert write.applied == [2]
+    assert len(queue) == 0
+
+
+def test_replay_waits_while_breaker_open(queue, breaker):
+    write = FakeWrite()
+    queue.put(write, (1,), {})
+    breaker._opened_at = float("inf")
+
+    assert asyncio.run(queue.replay(timeout=0.05)) == 0
+    assert len(queue) == 1
+
+
+def test_resilient_write_queues_when_unavailable(queue):
+    write = FakeWrite(unavailable())
+    wrapped = resilient_write(default=False)(write)
+
+    assert asyncio.run(wrapped(1)) is QUEUED
+    # Пока в очереди есть записи, новые записи встают за ними
+    assert asyncio.run(wrapped(2)) is QUEUED
+    assert len(queue) == 2
+
+    asyncio.run(queue.replay(timeout=0.05))
+    assert write.applied == [1, 2]
+
+
+def test_resilient_write_does_not_queue_timed_out_write(queue):
+    write = FakeWrite(asyncio.TimeoutError())
+    wrapped = resilient_write(default=False)(write)
+
+    assert asyncio.run(wrapped(1)) is False
+    assert len(queue) == 0
+    assert write.applied == []
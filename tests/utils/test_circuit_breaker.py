@@ -0,0 +1,98 @@
+import pytest
+
+from app.utils import circuit_breaker
+from app.utils.circuit_breaker import CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_stays_closed_below_threshold(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.is_open
+    assert breaker.allow_request()
+
+
+def test_success_resets_failures(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.is_open
+
+
+def test_opens_at_threshold_and_rejects_until_reset_timeout(breaker, clock):
+    open_breaker(breaker)
+    assert breaker.is_open
+    assert not breaker.allow_request()
+
+    clock.now += 29
+    assert not breaker.allow_request()
+
+
+def test_allows_single_probe_after_reset_timeout(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 30
+
+    assert breaker.allow_request()
+    # Пока пробный вызов не завершился, остальные вызовы отклоняются
+    assert not breaker.allow_request()
+
+
+def test_probe_success_closes(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow_request()
+    assert breaker.allow_request()
+
+
+def test_probe_failure_reopens(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow_request()
+
+    clock.now += 30
+    assert breaker.allow_request()
+
+
+def test_unfinished_probe_expires(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+
+    clock.now += 29
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()